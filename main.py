@@ -1,7 +1,9 @@
 import argparse
+import concurrent.futures
 import copy
 import csv
 import datetime
+import functools
 import itertools
 import math
 import statistics
@@ -13,7 +15,11 @@ from student import Assignment, Category, GradeReport, Multiplier, Student
 # TODO Put this in a config.
 LATE_MULTIPLIER_DESC = 'Late multiplier'
 LATE_MULTIPLIERS = [0.9, 0.8, 0.6]
+# Empty list means immediately 0.0 upon late.
+NO_LATE_MULTIPLIERS: List[float] = []
 LATE_GRACE = datetime.timedelta(minutes=5)
+# Shared zero so hot loops compare and assign without allocating.
+ZERO_LATENESS = datetime.timedelta(0)
 VERBOSE_COMMENTS = True
 ASSIGNMENT_NAME_FORMATS = ['{}', '{} - In-Person', '{} - Online']
 
@@ -26,14 +32,23 @@ def import_categories(path: str) -> Dict[str, Category]:
     :rtype: dict
     """
     categories: Dict[str, Category] = {}
-    with open(path) as roster_file:
-        reader = csv.DictReader(roster_file)
+    with open(path, newline='') as roster_file:
+        reader = csv.reader(roster_file)
+        header_index = {column: index for index, column in enumerate(next(reader, []))}
+        name_index = header_index['Name']
+        weight_index = header_index['Weight']
+        has_late_multiplier_index = header_index['Has Late Multiplier']
+        drops_index = header_index['Drops']
+        slip_days_index = header_index['Slip Days']
         for row in reader:
-            name = row['Name']
-            weight = float(row['Weight'])
-            has_late_multiplier = bool(int(row['Has Late Multiplier']))
-            drops = int(row['Drops'])
-            slip_days = int(row['Slip Days'])
+            if not row:
+                # DictReader skipped blank rows; preserve that.
+                continue
+            name = row[name_index]
+            weight = float(row[weight_index])
+            has_late_multiplier = bool(int(row[has_late_multiplier_index]))
+            drops = int(row[drops_index])
+            slip_days = int(row[slip_days_index])
             categories[name] = Category(name, weight, drops, slip_days, has_late_multiplier)
     return categories
 
@@ -48,14 +63,25 @@ def import_assignments(path: str, categories: Dict[str, Category]) -> Dict[str,
     :rtype: dict
     """
     assignments: Dict[str, Assignment] = {}
-    with open(path) as assignment_file:
-        reader = csv.DictReader(assignment_file)
+    with open(path, newline='') as assignment_file:
+        reader = csv.reader(assignment_file)
+        header_index = {column: index for index, column in enumerate(next(reader, []))}
+        name_index = header_index['Name']
+        category_index = header_index['Category']
+        possible_index = header_index['Possible']
+        weight_index = header_index['Weight']
+        slip_group_index = header_index['Slip Group']
         for row in reader:
-            name = row['Name']
-            category = row['Category']
-            score_possible = float(row['Possible'])
-            weight = float(row['Weight'])
-            slip_group = int(row['Slip Group'])
+            if not row:
+                # DictReader skipped blank rows; preserve that.
+                continue
+            # Interned so the many dict lookups keyed by assignment name
+            # downstream compare by pointer instead of by content.
+            name = sys.intern(row[name_index])
+            category = row[category_index]
+            score_possible = float(row[possible_index])
+            weight = float(row[weight_index])
+            slip_group = int(row[slip_group_index])
             if category not in categories:
                 raise RuntimeError(f'Assignment {name} references unknown category {category}')
             assignments[name] = Assignment(name, category, score_possible, weight, slip_group)
@@ -72,12 +98,19 @@ def import_overrides(path: str, assignments: Dict[str, Assignment]) -> Dict[int,
     :rtype: dict
     """
     overrides: Dict[int, Dict[str, float]] = {}
-    with open(path) as override_file:
-        reader = csv.DictReader(override_file)
+    with open(path, newline='') as override_file:
+        reader = csv.reader(override_file)
+        header_index = {column: index for index, column in enumerate(next(reader, []))}
+        sid_index = header_index['SID']
+        assignment_index = header_index['Assignment']
+        score_index = header_index['Score']
         for row in reader:
-            sid = int(row['SID'])
-            assignment_name = row['Assignment']
-            score = float(row['Score'])
+            if not row:
+                # DictReader skipped blank rows; preserve that.
+                continue
+            sid = int(row[sid_index])
+            assignment_name = row[assignment_index]
+            score = float(row[score_index])
             if assignment_name not in assignments:
                 raise RuntimeError(f'Override for {sid} references unknown assignment {assignment_name}')
             overrides.setdefault(sid, {})
@@ -86,6 +119,20 @@ def import_overrides(path: str, assignments: Dict[str, Assignment]) -> Dict[int,
             overrides[sid][assignment_name] = score
     return overrides
 
+@functools.lru_cache(maxsize=None)
+def parse_lateness(latenessstr: str) -> datetime.timedelta:
+    """Parses a Gradescope lateness formatted as HH:MM:SS.
+
+    Memoized since lateness strings repeat heavily across cells ('00:00:00' dominates any export), so each unique string is split and converted once and the resulting immutable timedelta is shared.
+
+    :param latenessstr: The lateness string.
+    :type latenessstr: str
+    :returns: The parsed lateness.
+    :rtype: datetime.timedelta
+    """
+    hours, minutes, seconds = latenessstr.split(':')
+    return datetime.timedelta(hours=int(hours), minutes=int(minutes), seconds=int(seconds))
+
 def import_roster_and_grades(roster_path: str, grades_path: str, categories: Dict[str, Category], assignments: Dict[str, Assignment], overrides: Optional[Dict[int, Dict[str, float]]] = None) -> Dict[int, List[Student]]:
     """Imports the CalCentral roster in the CSV file at the given path and then initializes students with the grades present in the given Gradescope grade report.
 
@@ -103,19 +150,46 @@ def import_roster_and_grades(roster_path: str, grades_path: str, categories: Dic
     :rtype: dict
     """
     students: Dict[int, List[Student]] = {}
-    with open(roster_path) as roster_file:
-        reader = csv.DictReader(roster_file)
+    with open(roster_path, newline='') as roster_file:
+        reader = csv.reader(roster_file)
+        header_index = {column: index for index, column in enumerate(next(reader, []))}
+        sid_index = header_index['Student ID']
+        name_index = header_index['Name']
         for row in reader:
-            sid = int(row['Student ID'])
-            name = row['Name']
+            if not row:
+                # DictReader skipped blank rows; preserve that.
+                continue
+            sid = int(row[sid_index])
+            name = row[name_index]
             students[sid] = [Student(sid, name, categories, assignments)]
-    with open(grades_path) as grades_file:
-        reader = csv.DictReader(grades_file)
+    # The Gradescope export is by far the largest input, so read it with a
+    # bigger buffer than the default 8KB to cut down on read syscalls.
+    with open(grades_path, buffering=1 << 20, newline='') as grades_file:
+        reader = csv.reader(grades_file)
+        header = next(reader, [])
+        header_index = {column: index for index, column in enumerate(header)}
+        sid_index = header_index['SID']
+
+        # Resolve each assignment's candidate score and lateness columns once
+        # so rows can be indexed directly rather than through per-row dicts.
+        assignment_columns: Dict[str, List[Tuple[int, int]]] = {}
+        for assignment in assignments.values():
+            columns: List[Tuple[int, int]] = []
+            for name_format in ASSIGNMENT_NAME_FORMATS:
+                real_name = name_format.format(assignment.name)
+                if real_name not in header_index:
+                    continue
+                columns.append((header_index[real_name], header_index[f'{real_name} - Lateness (H:M:S)']))
+            assignment_columns[assignment.name] = columns
+
         not_present_names: Set[str] = set()
         perfect_score_names: Set[str] = set()
         for row in reader:
+            if not row:
+                # DictReader skipped blank rows; preserve that.
+                continue
             try:
-                sid = int(row['SID'])
+                sid = int(row[sid_index])
             except ValueError as e:
                 continue
             if sid not in students:
@@ -123,29 +197,20 @@ def import_roster_and_grades(roster_path: str, grades_path: str, categories: Dic
                 continue
 
             # Create the base dict of student assignments.
-            student_assignments = copy.deepcopy(assignments)
-            for assignment in student_assignments.values():
+            student_assignments: Dict[str, Assignment] = {}
+            for assignment in assignments.values():
                 score: Optional[float] = None
                 comments: List[str] = []
 
                 # Loop through Gradescope possible assignment names that corresponds to the assignment.
-                for name_format in ASSIGNMENT_NAME_FORMATS:
-                    real_name = name_format.format(assignment.name)
-                    if real_name not in row:
-                        continue
-
-                    assignment_lateness_header = f'{real_name} - Lateness (H:M:S)'
-                    scorestr = row[real_name]
+                for score_index, lateness_index in assignment_columns[assignment.name]:
+                    scorestr = row[score_index]
 
                     # Get the score and lateness for the assignment.
                     if scorestr != '':
                         score = float(scorestr)
                         # Lateness formatted as HH:MM:SS.
-                        lateness_components = row[assignment_lateness_header].split(':')
-                        hours = int(lateness_components[0])
-                        minutes = int(lateness_components[1])
-                        seconds = int(lateness_components[2])
-                        lateness = datetime.timedelta(hours=hours, minutes=minutes, seconds=seconds)
+                        lateness = parse_lateness(row[lateness_index])
 
                         if assignment.name == 'Project 2 Autograder' or assignment.name == 'Project 2 Final Design Doc':
                             if lateness >= datetime.timedelta(days=9):
@@ -158,12 +223,12 @@ def import_roster_and_grades(roster_path: str, grades_path: str, categories: Dic
                     else:
                         # Empty string score string means no submission; assume 0.0.
                         score = 0.0
-                        lateness = datetime.timedelta(0)
+                        lateness = ZERO_LATENESS
                         # We found an empty string score, so mark it as 0.0, but don't break.
 
                 if score is None:
                     # No column for assignment.
-                    lateness = datetime.timedelta(0)
+                    lateness = ZERO_LATENESS
                     if assignment.name not in not_present_names:
                         not_present_names.add(assignment.name)
                         print(f'Warning: No grades present for {assignment.name}', file=sys.stderr)
@@ -175,17 +240,18 @@ def import_roster_and_grades(roster_path: str, grades_path: str, categories: Dic
                     new_score = overrides[sid][assignment.name]
                     comments.append(f'Overridden from {score}/{assignment.score_possible} to {new_score}/{assignment.score_possible}')
                     score = new_score
-                    lateness = datetime.timedelta(0)
+                    lateness = ZERO_LATENESS
 
                 # Track perfect scores. We do this because we expect some students to get a perfect score, so having no perfect scores could indicate an error in the inputs.
                 if score == assignment.score_possible:
                     perfect_score_names.add(assignment.name)
 
-                student_assignments[assignment.name].grade = Assignment.Grade(score, lateness, comments=comments)
+                student_assignments[assignment.name] = Assignment(assignment.name, assignment.category, assignment.score_possible, assignment.weight, assignment.slip_group, Assignment.Grade(score, lateness, comments=comments))
 
-            # Copy this dict to each student.
-            for student in students[sid]:
-                student.assignments = copy.deepcopy(student_assignments)
+            # Give this dict to each student; the roster produces one student
+            # per SID, so only hypothetical extra entries need a copy.
+            for index, student in enumerate(students[sid]):
+                student.assignments = student_assignments if index == 0 else {name: assignment.clone() for name, assignment in student_assignments.items()}
 
         # Print assignments that are present but did not receive any perfect scores as a warning.
         for assignment in assignments.values():
@@ -194,9 +260,27 @@ def import_roster_and_grades(roster_path: str, grades_path: str, categories: Dic
 
     return students
 
+def get_grading_fingerprint(student: Student) -> Tuple[Any, ...]:
+    """Returns a hashable fingerprint of all student state that can affect grading.
+
+    Two students with equal fingerprints are interchangeable for every later policy and for the final grade. Comments are deliberately excluded: they do not affect scores, and when duplicates are collapsed the first one is kept, which is the same representative the best-grade scan would have chosen anyway.
+
+    :param student: The student to fingerprint.
+    :type student: Student
+    :returns: A hashable fingerprint.
+    :rtype: tuple
+    """
+    return (
+        student.slip_days_used,
+        tuple((category.drops, category.slip_days, category.override) for category in student.categories.values()),
+        tuple((assignment.grade.score, assignment.grade.lateness, assignment.grade.slip_days_applied, tuple(assignment.grade.multipliers_applied), assignment.grade.dropped, assignment.grade.override) for assignment in student.assignments.values()),
+    )
+
 def apply_policy(policy: Callable[[Student], List[Student]], students: Dict[int, List[Student]]) -> Dict[int, List[Student]]:
     """Applies a policy function by flat mapping the returned list of outputs for each input student into a new iterable and returning it.
 
+    Possibilities that are duplicates for grading purposes (e.g. drop masks landing on equally-scored assignments) are collapsed to their first representative so they do not multiply through subsequent policies.
+
     :param policy: The policy function to apply.
     :type policy: callable
     :param students: The input students.
@@ -204,10 +288,27 @@ def apply_policy(policy: Callable[[Student], List[Student]], students: Dict[int,
     :returns: The SIDs mapped to the new students.
     :rtype: dict
     """
+    # Policies that only touch specific students advertise them so everyone
+    # else's possibilities pass through without being walked.
+    selective_sids: Optional[Set[int]] = getattr(policy, 'selective_sids', None)
+
     new_students: Dict[int, List[Student]] = {}
     for sid in students.keys():
-        new_students[sid] = [new_student for student in students[sid] for new_student in policy(student)]
-        assert len(new_students[sid]) > 0, 'Policy function returned an empty list'
+        if selective_sids is not None and sid not in selective_sids:
+            new_students[sid] = students[sid]
+            continue
+        possibilities = [new_student for student in students[sid] for new_student in policy(student)]
+        assert len(possibilities) > 0, 'Policy function returned an empty list'
+        if len(possibilities) > 1:
+            seen: Set[Tuple[Any, ...]] = set()
+            deduped: List[Student] = []
+            for possibility in possibilities:
+                fingerprint = get_grading_fingerprint(possibility)
+                if fingerprint not in seen:
+                    seen.add(fingerprint)
+                    deduped.append(possibility)
+            possibilities = deduped
+        new_students[sid] = possibilities
     return new_students
 
 def make_accommodations(path: str) -> Callable[[Student], List[Student]]:
@@ -220,21 +321,26 @@ def make_accommodations(path: str) -> Callable[[Student], List[Student]]:
     :returns: An accommodations policy function.
     :rtype: callable
     """
-    accommodations: Dict[int, List[Dict[str, str]]] = {}
-    with open(path) as accommodations_file:
-        reader = csv.DictReader(accommodations_file)
+    accommodations: Dict[int, List[Tuple[str, int, int]]] = {}
+    with open(path, newline='') as accommodations_file:
+        reader = csv.reader(accommodations_file)
+        header_index = {column: index for index, column in enumerate(next(reader, []))}
+        sid_index = header_index['SID']
+        category_index = header_index['Category']
+        drop_adjust_index = header_index['Drop Adjust']
+        slip_day_adjust_index = header_index['Slip Day Adjust']
         for row in reader:
-            sid = int(row['SID'])
-            accommodations.setdefault(sid, []).append(row)
+            if not row:
+                # DictReader skipped blank rows; preserve that.
+                continue
+            sid = int(row[sid_index])
+            accommodations.setdefault(sid, []).append((row[category_index], int(row[drop_adjust_index]), int(row[slip_day_adjust_index])))
 
     def accommodations_policy(student: Student) -> List[Student]:
         if student.sid not in accommodations:
             return [student]
-        new_student = copy.deepcopy(student)
-        for row in accommodations[new_student.sid]:
-            category = row['Category']
-            drop_adjust = int(row['Drop Adjust'])
-            slip_day_adjust = int(row['Slip Day Adjust'])
+        new_student = student.clone()
+        for category, drop_adjust, slip_day_adjust in accommodations[new_student.sid]:
             if category not in student.categories:
                 # If not present, it wasn't present in categories CSV.
                 raise RuntimeError(f'Accommodations reference nonexistent category {category}')
@@ -246,6 +352,7 @@ def make_accommodations(path: str) -> Callable[[Student], List[Student]]:
                 if slip_day_adjust > 0:
                     new_student.categories[category].comments.append(f'{slip_day_adjust} extra drops granted')
         return [new_student]
+    accommodations_policy.selective_sids = set(accommodations.keys()) # type: ignore[attr-defined]
     return accommodations_policy
 
 def make_extensions(path: str) -> Callable[[Student], List[Student]]:
@@ -256,31 +363,71 @@ def make_extensions(path: str) -> Callable[[Student], List[Student]]:
     :returns: An extensions policy function.
     :rtype: callable
     """
-    extensions: Dict[int, List[Dict[str, str]]] = {}
-    with open(path) as extensions_file:
-        reader = csv.DictReader(extensions_file)
+    extensions: Dict[int, List[Tuple[str, int]]] = {}
+    with open(path, newline='') as extensions_file:
+        reader = csv.reader(extensions_file)
+        header_index = {column: index for index, column in enumerate(next(reader, []))}
+        sid_index = header_index['SID']
+        assignment_index = header_index['Assignment']
+        days_index = header_index['Days']
         for row in reader:
-            sid = int(row['SID'])
-            extensions.setdefault(sid, []).append(row)
-    zero = datetime.timedelta(0)
-
+            if not row:
+                # DictReader skipped blank rows; preserve that.
+                continue
+            sid = int(row[sid_index])
+            extensions.setdefault(sid, []).append((row[assignment_index], int(row[days_index])))
     def extensions_policy(student: Student) -> List[Student]:
         if student.sid not in extensions:
             return [student]
-        new_student = copy.deepcopy(student)
-        for row in extensions[new_student.sid]:
-            assignment_name = row['Assignment']
-            days = int(row['Days'])
+        new_student = student.clone()
+        for assignment_name, days in extensions[new_student.sid]:
             if assignment_name not in student.assignments:
                 # If not present, it wasn't present in assignments CSV.
                 raise RuntimeError(f'Extension references unknown assignment {assignment_name}')
             grade = new_student.assignments[assignment_name].grade
-            grade.lateness = max(grade.lateness - datetime.timedelta(days=days), zero)
+            grade.lateness = max(grade.lateness - datetime.timedelta(days=days), ZERO_LATENESS)
             if VERBOSE_COMMENTS:
                 grade.comments.append(f'{days}-day extension granted')
         return [new_student]
+    extensions_policy.selective_sids = set(extensions.keys()) # type: ignore[attr-defined]
     return extensions_policy
 
+@functools.lru_cache(maxsize=None)
+def get_slip_allocations(caps: Tuple[int, ...], slip_days: int) -> Tuple[Tuple[int, ...], ...]:
+    """Enumerates all ways to allocate slip days against the given per-group caps.
+
+    Optimizes by ensuring that no allocation is returned that applies more slip days than its cap (the days needed for the group) and by ensuring that the maximal number of slip days are used. Since each group can use up to its cap independently, the maximal number of slip days used is min(slip_days, sum of caps), so exactly the allocations hitting that total are enumerated with an explicit stack. Memoized because many students share the same lateness shape.
+
+    :param caps: The maximal number of slip days usable by each group.
+    :type caps: tuple
+    :param slip_days: The total number of slip days available.
+    :type slip_days: int
+    :returns: A tuple of allocations, each a tuple of slip days parallel to caps.
+    :rtype: tuple
+    """
+    # suffix_caps[i] is the maximal number of slip days usable by caps[i:].
+    suffix_caps = [0] * (len(caps) + 1)
+    for index in range(len(caps) - 1, -1, -1):
+        suffix_caps[index] = suffix_caps[index + 1] + caps[index]
+    total_days_used = min(slip_days, suffix_caps[0])
+
+    allocations: List[Tuple[int, ...]] = []
+    stack: List[Tuple[int, Tuple[int, ...]]] = [(total_days_used, ())]
+    while stack:
+        days_left, partial = stack.pop()
+        index = len(partial)
+        if index == len(caps):
+            allocations.append(partial)
+            continue
+        # Only branch on counts that can still reach the maximal total.
+        # Pushed in descending order so allocations pop in ascending
+        # (lexicographic) order, matching the old recursive enumeration.
+        low = max(0, days_left - suffix_caps[index + 1])
+        high = min(caps[index], days_left)
+        for days in range(high, low - 1, -1):
+            stack.append((days_left - days, partial + (days,)))
+    return tuple(allocations)
+
 def slip_day_policy(student: Student) -> List[Student]:
     """A policy function that applies slip days per category.
 
@@ -292,28 +439,18 @@ def slip_day_policy(student: Student) -> List[Student]:
     :rtype: list
     """
     def get_slip_possibilities(latenesses: Dict[int, datetime.timedelta], slip_days: int) -> List[Dict[int, int]]:
-        # Basically np.meshgrid with max sum <= slip_days. Optimizes by
-        # ensuring that no possibility is returned that applies more slip days
-        # than is needed for an assignment and by ensuring that the maximal
-        # number of slip days are used.
-        def helper(keys: List[int], index: int, days_left: int) -> List[Dict[int, int]]:
-            if index == len(latenesses):
-                return [{}]
-            key = keys[index]
-            possibilities: List[Dict[int, int]] = []
-            days_late = math.ceil(latenesses[key].total_seconds() / 86400)
-            for i in range(min(days_late, days_left) + 1):
-                # i is the number of slip days used for the first assignment.
-                rest = helper(keys, index + 1, days_left - i)
-                for possibility in rest:
-                    possibility[key] = i
-                possibilities.extend(rest)
-            max_days_used = max(sum(possibility.values()) for possibility in possibilities)
-            possibilities = [possibility for possibility in possibilities if sum(possibility.values()) == max_days_used]
-            return possibilities
-        return helper(list(latenesses.keys()), 0, slip_days)
-
-    zero = datetime.timedelta(0)
+        keys = list(latenesses.keys())
+        caps = tuple(math.ceil(latenesses[key].total_seconds() / 86400) for key in keys)
+        return [dict(zip(keys, allocation)) for allocation in get_slip_allocations(caps, slip_days)]
+
+    # Index assignments by category and slip group once so the loops below do
+    # not rescan every assignment per category or per slip group.
+    assignments_by_category: Dict[str, List[Assignment]] = {}
+    assignment_names_by_slip_group: Dict[int, List[str]] = {}
+    for assignment in student.assignments.values():
+        assignments_by_category.setdefault(assignment.category, []).append(assignment)
+        if assignment.slip_group != -1:
+            assignment_names_by_slip_group.setdefault(assignment.slip_group, []).append(assignment.name)
 
     # slip_groups[i] have slip_possibilities[i].
     slip_groups: List[Set[int]] = []
@@ -321,11 +458,20 @@ def slip_day_policy(student: Student) -> List[Student]:
 
     for category_name in student.categories:
         category = student.categories[category_name]
+        if category.slip_days <= 0:
+            # No slip days to apply, so don't bother scanning for latenesses.
+            continue
         # Get all slip groups that the student has late in the category.
         category_latenesses: Dict[int, datetime.timedelta] = {}
-        for assignment in student.assignments.values():
-            if assignment.category == category.name and assignment.slip_group != -1 and assignment.grade.lateness > zero:
-                category_latenesses[assignment.slip_group] = max(category_latenesses.get(assignment.slip_group, zero), assignment.grade.lateness)
+        for assignment in assignments_by_category.get(category.name, []):
+            if assignment.slip_group != -1 and assignment.grade.lateness > ZERO_LATENESS:
+                category_latenesses[assignment.slip_group] = max(category_latenesses.get(assignment.slip_group, ZERO_LATENESS), assignment.grade.lateness)
+
+        if not category_latenesses:
+            # Nothing late in the category, so there is no way to usefully
+            # apply slip days; skip the category to keep the cross product
+            # below small.
+            continue
 
         # Get all possible ways of applying slip days.
         category_slip_possibilities = get_slip_possibilities(category_latenesses, category.slip_days)
@@ -333,6 +479,10 @@ def slip_day_policy(student: Student) -> List[Student]:
         slip_groups.append(set(category_latenesses.keys()))
         slip_possibilities.append(category_slip_possibilities)
 
+    if not slip_possibilities:
+        # Nothing late at all, so the only possibility is the student as-is.
+        return [student]
+
     new_students: List[Student] = [student]
 
     # All possibilities is the cross product of all possibilities in each category.
@@ -340,7 +490,10 @@ def slip_day_policy(student: Student) -> List[Student]:
         if sum(slip_days for category_slip_possibility in slip_possibility for slip_days in category_slip_possibility) == 0:
             # Skip 0 slip day application case since it is already present in the list.
             continue
-        student_with_slip = copy.deepcopy(student)
+        # Shallow-copy the student and clone only the assignments slip days
+        # are applied to; a deepcopy per possibility dominates runtime.
+        student_with_slip = copy.copy(student)
+        student_with_slip.assignments = dict(student.assignments)
         for category_index in range(len(slip_possibility)):
             category_slip_groups = slip_groups[category_index]
             category_slip_possibility = slip_possibility[category_index]
@@ -350,11 +503,15 @@ def slip_day_policy(student: Student) -> List[Student]:
                     # Not applying slip days for this group for this possibility, so skip.
                     continue
                 student_with_slip.slip_days_used += slip_days
-                for assignment in student_with_slip.assignments.values():
-                    if assignment.slip_group == slip_group:
-                        assignment.grade.lateness = max(assignment.grade.lateness - datetime.timedelta(days=slip_days), zero)
-                        assignment.grade.slip_days_applied += slip_days
-                        assignment.grade.comments.append(f"{slip_days} slip {'days' if slip_days > 1 else 'day'} applied")
+                slip_delta = datetime.timedelta(days=slip_days)
+                for assignment_name in assignment_names_by_slip_group[slip_group]:
+                    assignment = student_with_slip.assignments[assignment_name]
+                    if assignment is student.assignments[assignment_name]:
+                        assignment = assignment.clone()
+                        student_with_slip.assignments[assignment_name] = assignment
+                    assignment.grade.lateness = max(assignment.grade.lateness - slip_delta, ZERO_LATENESS)
+                    assignment.grade.slip_days_applied += slip_days
+                    assignment.grade.comments.append(f"{slip_days} slip {'days' if slip_days > 1 else 'day'} applied")
         new_students.append(student_with_slip)
 
     return new_students
@@ -371,28 +528,31 @@ def make_late_multiplier() -> Callable[[Student], List[Student]]:
         :returns: A one-element list containing a student with late multipliers applied.
         :rtype: list
         """
-        zero = datetime.timedelta(0)
-        one = datetime.timedelta(days=1)
+        grace_seconds = int(LATE_GRACE.total_seconds())
 
         def get_days_late(lateness: datetime.timedelta) -> int:
-            lateness = max(zero, lateness)
-            days_late = lateness.days
-            if lateness % one > LATE_GRACE:
+            # Integer arithmetic; the timedelta modulo used previously
+            # allocates a new timedelta per call.
+            seconds = max(0, int(lateness.total_seconds()))
+            days_late, remainder_seconds = divmod(seconds, 86400)
+            if remainder_seconds > grace_seconds:
                 days_late += 1
             return days_late
 
-        new_student = copy.deepcopy(student)
+        new_student = student.clone()
 
         # Build dict mapping slip groups to maximal number of days late.
         slip_group_lateness: Dict[int, datetime.timedelta] = {}
         for assignment in new_student.assignments.values():
-            if assignment.grade.lateness > zero and assignment.slip_group != -1 and (assignment.slip_group not in slip_group_lateness or assignment.grade.lateness > slip_group_lateness[assignment.slip_group]):
+            if assignment.grade.lateness > ZERO_LATENESS and assignment.slip_group != -1 and (assignment.slip_group not in slip_group_lateness or assignment.grade.lateness > slip_group_lateness[assignment.slip_group]):
                 slip_group_lateness[assignment.slip_group] = assignment.grade.lateness
 
+        # Cache the per-category multiplier flag so the loop below does one
+        # lookup per assignment instead of chasing the category object.
+        category_has_late_multiplier = {category.name: category.has_late_multiplier for category in student.categories.values()}
+
         # Apply lateness.
         for assignment in new_student.assignments.values():
-            category = student.categories[assignment.category]
-
             # Lateness is based on individual assignment if no slip group, else use early maximal value.
             days_late: int
             if assignment.slip_group in slip_group_lateness:
@@ -402,11 +562,10 @@ def make_late_multiplier() -> Callable[[Student], List[Student]]:
 
             if days_late > 0:
                 late_multipliers: List[float]
-                if category.has_late_multiplier:
+                if category_has_late_multiplier[assignment.category]:
                     late_multipliers = LATE_MULTIPLIERS
                 else:
-                    # Empty array means immediately 0.0 upon late.
-                    late_multipliers = []
+                    late_multipliers = NO_LATE_MULTIPLIERS
                     if assignment.name not in late_zero_names:
                         late_zero_names.add(assignment.name)
                         print(f'Warning: x0 late multiplier applied for {assignment.name}', file=sys.stderr)
@@ -422,6 +581,29 @@ def make_late_multiplier() -> Callable[[Student], List[Student]]:
 
     return late_multiplier_policy
 
+@functools.lru_cache(maxsize=None)
+def get_drop_masks(num_assignments: int, drops: int) -> Tuple[Tuple[bool, ...], ...]:
+    """Enumerates all ways to assign the given number of drops to the given number of assignments.
+
+    Memoized because every student in a category shares the same shape, so the masks are computed once and shared.
+
+    :param num_assignments: The number of assignments in the category.
+    :type num_assignments: int
+    :param drops: The number of drops provided in the category.
+    :type drops: int
+    :returns: A sorted tuple of masks, each a tuple of bools that are True where the assignment is dropped.
+    :rtype: tuple
+    """
+    num_dropped = min(max(drops, 0), num_assignments)
+    masks: List[Tuple[bool, ...]] = []
+    for dropped_indices in itertools.combinations(range(num_assignments), num_dropped):
+        mask = [False] * num_assignments
+        for index in dropped_indices:
+            mask[index] = True
+        masks.append(tuple(mask))
+    masks.sort()
+    return tuple(masks)
+
 def drop_policy(student: Student) -> List[Student]:
     """A policy function that applies drops per categories.
 
@@ -432,6 +614,12 @@ def drop_policy(student: Student) -> List[Student]:
     :returns: A list of students containing all possibilities of applying drops.
     :rtype: list
     """
+    # Index assignments by category once instead of rescanning the full
+    # assignment dict for every category.
+    assignments_by_category: Dict[str, List[Assignment]] = {}
+    for assignment in student.assignments.values():
+        assignments_by_category.setdefault(assignment.category, []).append(assignment)
+
     # Assignments in drop_assignments[i] have drop_possibilities[i].
     drop_assignments: List[List[str]] = []
     drop_possibilities: List[Tuple[Tuple[bool, ...], ...]] = []
@@ -439,15 +627,14 @@ def drop_policy(student: Student) -> List[Student]:
     for category in student.categories.values():
         # Get all ways to assign drops to assignments in the category.
         drops = student.categories[category.name].drops
-        assignments_in_category = [assignment for assignment in student.assignments.values() if assignment.category == category.name]
-        category_possibility = tuple(i < drops for i in range(len(assignments_in_category)))
+        assignments_in_category = assignments_by_category.get(category.name, [])
 
         drop_assignments.append([assignment.name for assignment in assignments_in_category])
-        drop_possibilities.append(tuple(sorted(set(itertools.permutations(category_possibility)))))
+        drop_possibilities.append(get_drop_masks(len(assignments_in_category), drops))
 
     new_students: List[Student] = []
     for drop_possibility in itertools.product(*drop_possibilities):
-        new_student = copy.deepcopy(student)
+        new_student = student.clone()
         for category_index in range(len(drop_possibility)):
             category_possibility = drop_possibility[category_index]
             for assignment_index in range(len(category_possibility)):
@@ -465,7 +652,7 @@ def drop_policy(student: Student) -> List[Student]:
 def make_clobbers(path: str, category_names: List[str], assignment_names: List[str], students: Dict[int, List[Student]]) -> Callable[[Student], List[Student]]:
     """Returns a policy function that applies clobbers based on the statistics in preliminary grade reports.
 
-    Clobbers are applied by returning every possibility of applying clobbers via assignment and category overrides.
+    Clobbers are applied greedily via assignment and category overrides: each clobber is kept exactly when it strictly improves the student's total grade, which picks the same single best possibility the old cross-product enumeration did.
 
     :param path: The path of the clobbers CSV.
     :type path: str
@@ -481,14 +668,23 @@ def make_clobbers(path: str, category_names: List[str], assignment_names: List[s
 
     category_clobbers: Dict[int, Dict[str, Tuple[str, float]]] = {} # SID -> target name -> (source, score)
     assignment_clobbers: Dict[int, Dict[str, Tuple[str, float]]] = {}
-    with open(path) as clobbers_file:
-        reader = csv.DictReader(clobbers_file)
+    with open(path, newline='') as clobbers_file:
+        reader = csv.reader(clobbers_file)
+        header_index = {column: index for index, column in enumerate(next(reader, []))}
+        scope_index = header_index['Scope']
+        target_index = header_index['Target']
+        source_index = header_index['Source']
+        scale_index = header_index['Scale']
+        type_index = header_index['Type']
         for row in reader:
-            scope = row['Scope']
-            target = row['Target']
-            source = row['Source']
-            scale = float(row['Scale'])
-            clobber_type = row['Type']
+            if not row:
+                # DictReader skipped blank rows; preserve that.
+                continue
+            scope = row[scope_index]
+            target = row[target_index]
+            source = row[source_index]
+            scale = float(row[scale_index])
+            clobber_type = row[type_index]
             for sid in prelim_reports:
                 if scope == 'CATEGORY':
                     source_score = prelim_reports[sid].categories[source].adjusted
@@ -520,51 +716,52 @@ def make_clobbers(path: str, category_names: List[str], assignment_names: List[s
                     if assignment_clobbers[sid][target][1] < new_score:
                         assignment_clobbers[sid][target] = (source, new_score)
 
-    def get_binary_combinations(n: int) -> List[List[bool]]:
-        if n == 0:
-            return [[]]
-        rest = get_binary_combinations(n - 1)
-        ret = []
-        for r in rest:
-            ret.append([False, *r])
-            ret.append([True, *r])
-        return ret
-
     def clobber_policy(student: Student) -> List[Student]:
-        # category_names[i] has combinations category_combinations[i].
-        if student.sid in category_clobbers:
-            category_names = [name for name in category_clobbers[student.sid] if student.categories[name].override is None]
-        else:
-            category_names = []
-        category_combinations = get_binary_combinations(len(category_names))
-        # assignment_names[i] has combinations assignment_combinations[i].
+        # Clobber targets are independent and the total grade is monotone in
+        # each target's score, so instead of enumerating the cross product of
+        # on/off choices, each clobber is applied exactly when it strictly
+        # improves the total grade. Strictness matches the old enumeration,
+        # which preferred not clobbering between equal-grade possibilities.
+        new_student = student.clone()
+
+        # Assignment clobbers first: their effect on the total is only
+        # visible while the category is not overridden.
+        applied_assignments_by_category: Dict[str, List[Assignment]] = {}
         if student.sid in assignment_clobbers:
-            assignment_names = [name for name in assignment_clobbers[student.sid] if student.assignments[name].grade.override is None]
-        else:
-            assignment_names = []
-        assignment_combinations = get_binary_combinations(len(assignment_names))
-
-        new_students: List[Student] = []
-        for combination in itertools.product(category_combinations, assignment_combinations):
-            new_student = copy.deepcopy(student)
-            category_combination = combination[0]
-            assignment_combination = combination[1]
-            for i in range(len(category_combination)):
-                if category_combination[i]:
-                    category_name = category_names[i]
-                    category_clobber = category_clobbers[student.sid][category_name]
-                    category = new_student.categories[category_name]
-                    category.override = category_clobber[1]
-                    category.comments.append(f'Clobbered by {category_clobber[0]}')
-            for i in range(len(assignment_combination)):
-                if assignment_combination[i]:
-                    assignment_name = assignment_names[i]
-                    assignment_clobber = assignment_clobbers[student.sid][assignment_name]
-                    assignment = new_student.assignments[assignment_name]
-                    assignment.grade.override = assignment_clobber[1] * assignment.score_possible
+            total_grade = new_student.get_total_grade()
+            for assignment_name, assignment_clobber in assignment_clobbers[student.sid].items():
+                assignment = new_student.assignments[assignment_name]
+                if assignment.grade.override is not None:
+                    continue
+                assignment.grade.override = assignment_clobber[1] * assignment.score_possible
+                new_total_grade = new_student.get_total_grade()
+                if new_total_grade > total_grade:
+                    total_grade = new_total_grade
                     assignment.grade.comments.append(f'Clobbered by {assignment_clobber[0]}')
-            new_students.append(new_student)
-        return new_students
+                    applied_assignments_by_category.setdefault(assignment.category, []).append(assignment)
+                else:
+                    assignment.grade.override = None
+
+        if student.sid in category_clobbers:
+            total_grade = new_student.get_total_grade()
+            for category_name, category_clobber in category_clobbers[student.sid].items():
+                category = new_student.categories[category_name]
+                if category.override is not None:
+                    continue
+                category.override = category_clobber[1]
+                new_total_grade = new_student.get_total_grade()
+                if new_total_grade > total_grade:
+                    total_grade = new_total_grade
+                    category.comments.append(f'Clobbered by {category_clobber[0]}')
+                    # The override makes this category's assignment clobbers
+                    # no-ops; undo them like the old enumeration, which broke
+                    # the tie in favor of not clobbering.
+                    for applied_assignment in applied_assignments_by_category.get(category_name, []):
+                        applied_assignment.grade.override = None
+                        applied_assignment.grade.comments.pop()
+                else:
+                    category.override = None
+        return [new_student]
     return clobber_policy
 
 def make_grade_assumption(assignment_name: str, score: float, comment: str) -> Callable[[Student], List[Student]]:
@@ -580,7 +777,7 @@ def make_grade_assumption(assignment_name: str, score: float, comment: str) -> C
     :rtype: callable
     """
     def grade_assumption_policy(student: Student) -> List[Student]:
-        new_student = copy.deepcopy(student)
+        new_student = student.clone()
         if assignment_name not in student.assignments:
             # If not present, it wasn't present in assignments CSV.
             raise RuntimeError(f'Grade assumption references unknown assignment {assignment_name}')
@@ -608,7 +805,7 @@ def make_comments(comments: Dict[int, Dict[str, List[str]]]) -> Callable[[Studen
     def comments_policy(student: Student) -> List[Student]:
         if student.sid not in comments:
             return [student]
-        new_student = copy.deepcopy(student)
+        new_student = student.clone()
         for assignment_name in comments[new_student.sid]:
             if assignment_name not in student.assignments:
                 # If not present, it wasn't present in assignments CSV.
@@ -617,15 +814,59 @@ def make_comments(comments: Dict[int, Dict[str, List[str]]]) -> Callable[[Studen
             assignment_comments = comments[new_student.sid][assignment_name]
             assignment.grade.comments.extend(assignment_comments)
         return [new_student]
+    comments_policy.selective_sids = set(comments.keys()) # type: ignore[attr-defined]
     return comments_policy
 
+def make_per_student_policies(extensions_path: Optional[str], accommodations_path: Optional[str]) -> List[Callable[[Student], List[Student]]]:
+    """Returns the policy functions that depend only on a single student, in application order.
+
+    These are the policies that can be applied to any subset of the students independently, as opposed to policies like clobbers that need statistics across the whole roster.
+
+    :param extensions_path: The path of the extensions CSV, or None if not provided.
+    :type extensions_path: str
+    :param accommodations_path: The path of the accommodations CSV, or None if not provided.
+    :type accommodations_path: str
+    :returns: A list of policy functions.
+    :rtype: list
+    """
+    policies: List[Callable[[Student], List[Student]]] = []
+    if accommodations_path:
+        policies.append(make_accommodations(accommodations_path))
+    if extensions_path:
+        policies.append(make_extensions(extensions_path))
+    # The following line is useful for mid-semester grade reports and the like.
+    #policies.append(make_grade_assumption('Homework 7', 31, 'Assumed 100%'))
+    policies.append(slip_day_policy)
+    policies.append(make_late_multiplier())
+    policies.append(drop_policy)
+    return policies
+
+def apply_per_student_policies(students: Dict[int, List[Student]], extensions_path: Optional[str], accommodations_path: Optional[str]) -> Dict[int, List[Student]]:
+    """Applies the per-student policies to the given students.
+
+    This is a module-level function (rather than a closure) so that it can be pickled and dispatched to worker processes.
+
+    :param students: The input students.
+    :type students: dict
+    :param extensions_path: The path of the extensions CSV, or None if not provided.
+    :type extensions_path: str
+    :param accommodations_path: The path of the accommodations CSV, or None if not provided.
+    :type accommodations_path: str
+    :returns: The SIDs mapped to the new students.
+    :rtype: dict
+    """
+    for policy in make_per_student_policies(extensions_path, accommodations_path):
+        students = apply_policy(policy, students)
+    return students
+
 def generate_grade_reports(students: Dict[int, List[Student]]) -> Dict[int, GradeReport]:
     grade_reports: Dict[int, GradeReport] = {}
     for sid in students:
-        for student in students[sid]:
-            grade_report = student.get_grade_report()
-            if sid not in grade_reports or grade_report.total_grade > grade_reports[sid].total_grade:
-                grade_reports[sid] = grade_report
+        # Only the winning possibility needs a full report; scan the rest
+        # with the scalar total-grade fast path. max keeps the first of any
+        # equal-grade possibilities, like the strict comparison it replaces.
+        best_student = max(students[sid], key=Student.get_total_grade)
+        grade_reports[sid] = best_student.get_grade_report()
     return grade_reports
 
 def dump_students(students: Dict[int, List[Student]], assignments: Dict[str, Assignment], categories: Dict[str, Category], rounding: Optional[int] = None, outfile: TextIO = sys.stdout) -> None:
@@ -654,14 +895,26 @@ def dump_students(students: Dict[int, List[Student]], assignments: Dict[str, Ass
         header.append(f'{assignment.name} - Adjusted Score')
         header.append(f'{assignment.name} - Weighted Score')
         header.append(f'{assignment.name} - Comments')
-    rows: List[List[Any]] = [header]
+    # Compute percentiles.
+    students_by_score = list(students.keys())
+    students_by_score.sort(key=lambda sid: grade_reports[sid].total_grade, reverse=True)
+    num_students = len(students)
+    student_percentiles: Dict[int, float] = {}
+    for rank in range(len(students)):
+        sid = students_by_score[rank]
+        student_percentiles[sid] = 1.0 - rank / num_students
+
+    # Write each student's row as it is derived rather than materializing,
+    # mutating, and rounding the full table in memory first.
+    writer = csv.writer(outfile)
+    writer.writerow(header)
+    absent = ('no grades found', 'no grades found', 'no grades found', 'no grades found')
     for sid in students:
         grade_report = grade_reports[sid]
-        row: List[Any] = [grade_report.student.sid, grade_report.student.name, grade_report.total_grade, 0.0, grade_report.student.slip_days_used] # 0.0 is temporary percentile.
-        absent = ('no grades found', 'no grades found', 'no grades found', 'no grades found')
+        row: List[Any] = [grade_report.student.sid, grade_report.student.name, grade_report.total_grade, student_percentiles[sid], grade_report.student.slip_days_used]
         for category in categories.values():
-            if category.name in grade_report.categories:
-                category_report = grade_report.categories[category.name]
+            category_report = grade_report.categories.get(category.name)
+            if category_report is not None:
                 row.append(category_report.raw)
                 row.append(category_report.adjusted)
                 row.append(category_report.weighted)
@@ -669,38 +922,20 @@ def dump_students(students: Dict[int, List[Student]], assignments: Dict[str, Ass
             else:
                 row.extend(absent)
         for assignment in assignments.values():
-            if assignment.name in grade_report.assignments:
-                assignment_report = grade_report.assignments[assignment.name]
+            assignment_report = grade_report.assignments.get(assignment.name)
+            if assignment_report is not None:
                 row.append(assignment_report.raw)
                 row.append(assignment_report.adjusted)
                 row.append(assignment_report.weighted)
                 row.append(', '.join(assignment_report.comments))
             else:
                 row.extend(absent)
-        rows.append(row)
-
-    # Compute percentiles.
-    students_by_score = list(students.keys())
-    students_by_score.sort(key=lambda sid: grade_reports[sid].total_grade, reverse=True)
-    num_students = len(students)
-    student_percentiles: Dict[int, float] = {}
-    for rank in range(len(students)):
-        sid = students_by_score[rank]
-        student_percentiles[sid] = 1.0 - rank / num_students
-    for row in rows:
-        if row is header:
-            continue
-        sid = row[0]
-        row[3] = student_percentiles[sid]
 
-    # Round rows.
-    if rounding is not None:
-        for row in rows:
-            for i in range(len(row)):
-                if isinstance(row[i], float):
-                    row[i] = round(row[i], rounding)
+        # Round the row.
+        if rounding is not None:
+            row = [round(value, rounding) if isinstance(value, float) else value for value in row]
 
-    csv.writer(outfile).writerows(rows)
+        writer.writerow(row)
 
 def main(args: argparse.Namespace) -> None:
     roster_path: str = args.roster
@@ -713,6 +948,7 @@ def main(args: argparse.Namespace) -> None:
     accommodations_path: Optional[str] = args.accommodations
     output_path: Optional[str] = args.output
     rounding = int(args.rounding) if args.rounding else None
+    jobs = int(args.jobs) if args.jobs else 1
 
     categories = import_categories(categories_path)
     assignments = import_assignments(assignments_path, categories)
@@ -723,21 +959,29 @@ def main(args: argparse.Namespace) -> None:
         overrides = None
     students = import_roster_and_grades(roster_path, grades_path, categories, assignments, overrides)
 
-    if accommodations_path:
-        students = apply_policy(make_accommodations(accommodations_path), students)
-    if extensions_path:
-        students = apply_policy(make_extensions(extensions_path), students)
-    # The following line is useful for mid-semester grade reports and the like.
-    #students = apply_policy(make_grade_assumption('Homework 7', 31, 'Assumed 100%'), students)
-    students = apply_policy(slip_day_policy, students)
-    students = apply_policy(make_late_multiplier(), students)
-    students = apply_policy(drop_policy, students)
+    if jobs > 1:
+        # Students are independent under the per-student policies, so chunk
+        # the roster across worker processes. Each worker rebuilds the policy
+        # functions from the CSV paths since closures cannot be pickled.
+        sids = list(students.keys())
+        chunks = [{sid: students[sid] for sid in sids[i::jobs]} for i in range(jobs) if sids[i::jobs]]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(apply_per_student_policies, chunk, extensions_path, accommodations_path) for chunk in chunks]
+            merged: Dict[int, List[Student]] = {}
+            for future in futures:
+                merged.update(future.result())
+        # Preserve roster order so the output is identical to a serial run.
+        students = {sid: merged[sid] for sid in sids}
+    else:
+        students = apply_per_student_policies(students, extensions_path, accommodations_path)
     if clobbers_path:
         students = apply_policy(make_clobbers(clobbers_path, list(categories), list(assignments), students), students)
     students = apply_policy(make_comments(COMMENTS), students)
 
     if output_path is not None:
-        with open(output_path, 'w') as outfile:
+        # newline='' defers line endings to the csv writer; the big buffer
+        # batches the row writes into few syscalls.
+        with open(output_path, 'w', buffering=1 << 20, newline='') as outfile:
             dump_students(students, assignments, categories, rounding=rounding, outfile=outfile)
     else:
         dump_students(students, assignments, categories, rounding=rounding, outfile=sys.stdout)
@@ -753,6 +997,7 @@ if __name__ == '__main__':
     parser.add_argument('--extensions', '-e', help='CSV with extensions')
     parser.add_argument('--accommodations', '-a', help='CSV with accommodations for drops and slip days')
     parser.add_argument('--rounding', '-r', help='Number of decimal places to round to')
+    parser.add_argument('--jobs', '-j', help='Number of worker processes for per-student policies')
     parser.add_argument('--output', '-o', help='Output CSV file')
     #parser.add_argument('--config', '--c', help='yaml file of configs')
     #parser.add_argument('-v', '--verbose', action='count', help='verbosity')
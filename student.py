@@ -5,12 +5,12 @@ from dataclasses import dataclass, field
 
 from typing import Dict, List, NamedTuple, Optional, Tuple
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Multiplier:
     multiplier: float
     description: str
 
-@dataclass
+@dataclass(slots=True)
 class Category:
     name: str
     weight: float
@@ -20,9 +20,12 @@ class Category:
     override: Optional[float] = None
     comments: List[str] = field(default_factory=list)
 
-@dataclass
+    def clone(self) -> 'Category':
+        return Category(self.name, self.weight, self.drops, self.slip_days, self.has_late_multiplier, self.override, list(self.comments))
+
+@dataclass(slots=True)
 class Assignment:
-    @dataclass
+    @dataclass(slots=True)
     class Grade:
         score: Optional[float]
         lateness: datetime.timedelta
@@ -32,6 +35,9 @@ class Assignment:
         override: Optional[float] = None
         comments: List[str] = field(default_factory=list)
 
+        def clone(self) -> 'Assignment.Grade':
+            return Assignment.Grade(self.score, self.lateness, self.slip_days_applied, list(self.multipliers_applied), self.dropped, self.override, list(self.comments))
+
         def get_score(self) -> float:
             if self.score is None:
                 return 0.0
@@ -47,16 +53,19 @@ class Assignment:
     slip_group: int
     grade: 'Assignment.Grade' = field(default_factory=lambda: Assignment.Grade(None, datetime.timedelta(0)))
 
-@dataclass
+    def clone(self) -> 'Assignment':
+        return Assignment(self.name, self.category, self.score_possible, self.weight, self.slip_group, self.grade.clone())
+
+@dataclass(slots=True)
 class GradeReport:
-    @dataclass
+    @dataclass(slots=True)
     class CategoryEntry:
         raw: float
         adjusted: float
         weighted: float
         comments: List[str] = field(default_factory=list)
 
-    @dataclass
+    @dataclass(slots=True)
     class AssignmentEntry:
         raw: float
         adjusted: float
@@ -68,7 +77,7 @@ class GradeReport:
     categories: Dict[str, 'GradeReport.CategoryEntry'] = field(default_factory=dict)
     assignments: Dict[str, 'GradeReport.AssignmentEntry'] = field(default_factory=dict)
 
-@dataclass
+@dataclass(slots=True)
 class Student:
     sid: int
     name: str
@@ -76,10 +85,65 @@ class Student:
     assignments: Dict[str, Assignment]
     slip_days_used: int = 0
 
+    def clone(self) -> 'Student':
+        """Returns a copy of this student whose categories, assignments, and grades can be mutated independently.
+
+        Equivalent to a deepcopy for the purposes of policy functions, but directly rebuilds only the objects policies mutate rather than walking the whole object graph.
+
+        :returns: The cloned student.
+        :rtype: Student
+        """
+        categories = {name: category.clone() for name, category in self.categories.items()}
+        assignments = {name: assignment.clone() for name, assignment in self.assignments.items()}
+        return Student(self.sid, self.name, categories, assignments, self.slip_days_used)
+
+    def get_total_grade(self) -> float:
+        """Returns this student's total grade without deriving a full grade report.
+
+        The arithmetic mirrors get_grade_report exactly (same operations in the same order) so the two can never disagree about which grade possibility is best; this just skips allocating the per-category and per-assignment entries, which is what makes scanning millions of discarded possibilities cheap.
+
+        :returns: The total grade.
+        :rtype: float
+        """
+        assignments_by_category: Dict[str, List[Assignment]] = {name: [] for name in self.categories}
+        for assignment in self.assignments.values():
+            if assignment.category in assignments_by_category:
+                assignments_by_category[assignment.category].append(assignment)
+
+        total_grade = 0.0
+        for category in self.categories.values():
+            assignments_in_category = assignments_by_category[category.name]
+            category_numerator = 0.0 # Category-weighted grades on assignments
+            category_denominator = 0.0 # Total assignment weights
+
+            for assignment in assignments_in_category:
+                grade = self.assignments[assignment.name].grade
+                if not grade.dropped:
+                    category_denominator += assignment.weight
+
+            for assignment in assignments_in_category:
+                grade = self.assignments[assignment.name].grade
+                if not grade.dropped:
+                    category_numerator += grade.get_score() / assignment.score_possible * assignment.weight
+
+            category_raw_grade = category_numerator / category_denominator if category_denominator > 0.0 else 0.0
+            if category.override is not None:
+                category_adjusted_grade = category.override
+            else:
+                category_adjusted_grade = category_raw_grade
+            total_grade += category_adjusted_grade * category.weight
+
+        return total_grade
+
     def get_grade_report(self) -> GradeReport:
+        assignments_by_category: Dict[str, List[Assignment]] = {name: [] for name in self.categories}
+        for assignment in self.assignments.values():
+            if assignment.category in assignments_by_category:
+                assignments_by_category[assignment.category].append(assignment)
+
         grade_report = GradeReport(self)
         for category in self.categories.values():
-            assignments_in_category = list(assignment for assignment in self.assignments.values() if assignment.category == category.name)
+            assignments_in_category = assignments_by_category[category.name]
             category_numerator = 0.0 # Category-weighted grades on assignments
             category_denominator = 0.0 # Total assignment weights
 